@@ -19,7 +19,13 @@ const MIGRATION_MAPPING = {
   'main': ['001_auth_service_schema.sql'],
   'blood': ['002_blood_platform_schema.sql'],
   'complaint': ['003_complaint_platform_schema.sql'],
-  'traffic': ['005_traffic_platform_schema.sql']
+  'traffic': [
+    '005_traffic_platform_schema.sql',
+    '006_traffic_platform_id_sequences.sql',
+    '007_traffic_platform_date_indexes.sql',
+    '008_traffic_platform_daily_partitions.sql',
+    '009_traffic_platform_signal_history_storage.sql'
+  ]
 };
 
 /**
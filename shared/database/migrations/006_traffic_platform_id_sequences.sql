@@ -0,0 +1,89 @@
+-- Migration: 006_traffic_platform_id_sequences.sql
+-- Branch: traffic-management
+-- Description: Generate human-readable detection/route/event IDs from sequences instead of per-insert COUNT(*)
+
+-- Sequences backing the human-readable IDs
+CREATE SEQUENCE IF NOT EXISTS emergency_detection_id_seq;
+CREATE SEQUENCE IF NOT EXISTS emergency_route_id_seq;
+CREATE SEQUENCE IF NOT EXISTS system_event_id_seq;
+
+-- Build an ID like ED-2024-001 from a sequence (padding grows past the minimum width).
+-- The date part is formatted in UTC because pg_cron fires the resets below at 00:00 GMT;
+-- formatting in the session TimeZone (e.g. IST) would start a new date prefix hours
+-- before or after the counter restarts and reuse numbers under it.
+CREATE OR REPLACE FUNCTION next_readable_id(prefix TEXT, date_format TEXT, seq REGCLASS, width INTEGER)
+RETURNS TEXT AS $$
+DECLARE
+    n BIGINT := nextval(seq);
+BEGIN
+    RETURN prefix || '-' || to_char(CURRENT_TIMESTAMP AT TIME ZONE 'UTC', date_format) || '-' ||
+           lpad(n::text, GREATEST(width, length(n::text)), '0');
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+-- Continue numbering from the rows already written in the current period
+SELECT setval('emergency_detection_id_seq', GREATEST(COUNT(*), 1), COUNT(*) > 0)
+FROM emergency_detections
+WHERE date_trunc('year', detection_time) = date_trunc('year', CURRENT_TIMESTAMP AT TIME ZONE 'UTC');
+
+SELECT setval('emergency_route_id_seq', GREATEST(COUNT(*), 1), COUNT(*) > 0)
+FROM emergency_routes
+WHERE date_trunc('year', created_at) = date_trunc('year', CURRENT_TIMESTAMP AT TIME ZONE 'UTC');
+
+SELECT setval('system_event_id_seq', GREATEST(COUNT(*), 1), COUNT(*) > 0)
+FROM system_events
+WHERE timestamp::date = (CURRENT_TIMESTAMP AT TIME ZONE 'UTC')::date;
+
+ALTER TABLE emergency_detections
+    ALTER COLUMN detection_id SET DEFAULT next_readable_id('ED', 'YYYY', 'emergency_detection_id_seq', 3);
+ALTER TABLE emergency_routes
+    ALTER COLUMN route_id SET DEFAULT next_readable_id('ER', 'YYYY', 'emergency_route_id_seq', 3);
+ALTER TABLE system_events
+    ALTER COLUMN event_id SET DEFAULT next_readable_id('SE', 'YYYYMMDD', 'system_event_id_seq', 4);
+
+-- Restart numbering when the date component of the ID rolls over
+CREATE OR REPLACE FUNCTION reset_daily_id_sequences()
+RETURNS VOID AS $$
+BEGIN
+    ALTER SEQUENCE system_event_id_seq RESTART;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION reset_yearly_id_sequences()
+RETURNS VOID AS $$
+BEGIN
+    ALTER SEQUENCE emergency_detection_id_seq RESTART;
+    ALTER SEQUENCE emergency_route_id_seq RESTART;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Schedule the resets with pg_cron. pg_cron only runs in cron.database_name (usually
+-- "postgres", not the branch's "neondb"), so jobs are scheduled with
+-- cron.schedule_in_database() targeting this database. When this migration runs
+-- elsewhere, the exact statements to run in the cron database are printed instead.
+-- IDs issued between 00:00 GMT and the moment the job actually runs still carry the old
+-- counter under the new prefix, so keep the job on time (pg_cron starts within seconds).
+DO $$
+DECLARE
+    cron_database TEXT := current_setting('cron.database_name', true);
+BEGIN
+    IF cron_database IS NULL THEN
+        RAISE NOTICE 'pg_cron is not loaded; schedule reset_daily_id_sequences() at 00:00 GMT daily and reset_yearly_id_sequences() at 00:00 GMT on 1 January';
+    ELSIF cron_database = current_database() THEN
+        CREATE EXTENSION IF NOT EXISTS pg_cron;
+        PERFORM cron.schedule_in_database('reset-daily-id-sequences', '0 0 * * *', 'SELECT reset_daily_id_sequences()', current_database());
+        PERFORM cron.schedule_in_database('reset-yearly-id-sequences', '0 0 1 1 *', 'SELECT reset_yearly_id_sequences()', current_database());
+    ELSE
+        RAISE NOTICE '%', format(
+            'pg_cron runs in database %s; run there: '
+            'SELECT cron.schedule_in_database(%L, %L, %L, %L); '
+            'SELECT cron.schedule_in_database(%L, %L, %L, %L);',
+            cron_database,
+            'reset-daily-id-sequences', '0 0 * * *', 'SELECT reset_daily_id_sequences()', current_database(),
+            'reset-yearly-id-sequences', '0 0 1 1 *', 'SELECT reset_yearly_id_sequences()', current_database()
+        );
+    END IF;
+EXCEPTION WHEN OTHERS THEN
+    RAISE NOTICE 'Could not schedule ID sequence resets: %', SQLERRM;
+END;
+$$;
@@ -0,0 +1,15 @@
+-- Migration: 007_traffic_platform_date_indexes.sql
+-- Branch: traffic-management
+-- Description: Expression and covering indexes for the date-filtered analytics and retention queries
+
+-- Analytics filter on column::date, which a plain B-tree on the timestamp cannot serve
+CREATE INDEX IF NOT EXISTS idx_emergency_detections_date ON emergency_detections((detection_time::date));
+CREATE INDEX IF NOT EXISTS idx_emergency_routes_date ON emergency_routes((created_at::date));
+
+-- Retention cleanup filters signal history on start_time alone
+CREATE INDEX IF NOT EXISTS idx_signal_history_start_time ON signal_state_history(start_time);
+
+-- Signal-wise detection statistics, answered from the index without heap fetches for confidence
+CREATE INDEX IF NOT EXISTS idx_emergency_detections_signal_time_covering
+    ON emergency_detections(signal_id, detection_time DESC) INCLUDE (confidence);
+DROP INDEX IF EXISTS idx_emergency_detections_signal_time;
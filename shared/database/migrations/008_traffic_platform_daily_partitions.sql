@@ -0,0 +1,194 @@
+-- Migration: 008_traffic_platform_daily_partitions.sql
+-- Branch: traffic-management
+-- Description: Range-partition emergency_detections and system_events by day so retention drops partitions instead of deleting rows
+
+-- Create one partition per day in [start_day, end_day], named <parent>_pYYYYMMDD.
+-- Rows for a day that already landed in the DEFAULT partition are moved into the new
+-- partition before it is attached; attaching over them would otherwise fail with
+-- "updated partition constraint for default partition would be violated".
+CREATE OR REPLACE FUNCTION create_daily_partitions(parent REGCLASS, start_day DATE, end_day DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    partition_day DATE := start_day;
+    partition_name TEXT;
+    key_column TEXT;
+    default_partition REGCLASS;
+    created INTEGER := 0;
+BEGIN
+    SELECT a.attname, NULLIF(p.partdefid, 0)::regclass
+    INTO key_column, default_partition
+    FROM pg_partitioned_table p
+    JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = p.partattrs[0]
+    WHERE p.partrelid = parent;
+
+    WHILE partition_day <= end_day LOOP
+        partition_name := parent::text || '_p' || to_char(partition_day, 'YYYYMMDD');
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                partition_name, parent
+            );
+            IF default_partition IS NOT NULL THEN
+                -- Hold off new rows for this day until the partition is attached
+                EXECUTE format('LOCK TABLE %s IN EXCLUSIVE MODE', default_partition);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM %s WHERE %I >= %L AND %I < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM moved',
+                    default_partition, key_column, partition_day, key_column, partition_day + 1,
+                    partition_name
+                );
+            END IF;
+            EXECUTE format(
+                'ALTER TABLE %s ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                parent, partition_name, partition_day, partition_day + 1
+            );
+            created := created + 1;
+        END IF;
+        partition_day := partition_day + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Give every day held in the DEFAULT partition its own partition, then create
+-- days_ahead days of partitions past today
+CREATE OR REPLACE FUNCTION maintain_daily_partitions(parent REGCLASS, days_ahead INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    default_partition REGCLASS;
+    key_column TEXT;
+    stray_day DATE;
+    created INTEGER := 0;
+BEGIN
+    SELECT a.attname, NULLIF(p.partdefid, 0)::regclass
+    INTO key_column, default_partition
+    FROM pg_partitioned_table p
+    JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = p.partattrs[0]
+    WHERE p.partrelid = parent;
+
+    IF default_partition IS NOT NULL THEN
+        FOR stray_day IN
+            EXECUTE format('SELECT DISTINCT %I::date FROM %s', key_column, default_partition)
+        LOOP
+            created := created + create_daily_partitions(parent, stray_day, stray_day);
+        END LOOP;
+    END IF;
+
+    RETURN created + create_daily_partitions(parent, CURRENT_DATE, CURRENT_DATE + days_ahead);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Drop the daily partitions that end on or before cutoff_day
+CREATE OR REPLACE FUNCTION drop_daily_partitions_before(parent REGCLASS, cutoff_day DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    partition_name TEXT;
+    dropped INTEGER := 0;
+BEGIN
+    FOR partition_name IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = parent
+          AND c.relname ~ '_p[0-9]{8}$'
+          AND to_date(right(c.relname, 8), 'YYYYMMDD') < cutoff_day
+    LOOP
+        EXECUTE format('DROP TABLE %I', partition_name);
+        dropped := dropped + 1;
+    END LOOP;
+    RETURN dropped;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Emergency detections: rebuild as a partitioned table and move existing rows across
+ALTER TABLE emergency_detections RENAME TO emergency_detections_unpartitioned;
+
+CREATE TABLE emergency_detections (
+    LIKE emergency_detections_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+) PARTITION BY RANGE (detection_time);
+
+CREATE TABLE emergency_detections_default PARTITION OF emergency_detections DEFAULT;
+
+SELECT create_daily_partitions(
+    'emergency_detections',
+    COALESCE((SELECT MIN(detection_time)::date FROM emergency_detections_unpartitioned), CURRENT_DATE),
+    CURRENT_DATE + 7
+);
+
+INSERT INTO emergency_detections SELECT * FROM emergency_detections_unpartitioned;
+
+ALTER SEQUENCE emergency_detections_id_seq OWNED BY emergency_detections.id;
+DROP TABLE emergency_detections_unpartitioned;
+
+-- Unique constraints on a partitioned table must include the partition key. The
+-- detection_time::date index from 007 is not recreated: analytics now filter on a
+-- detection_time range, which partition pruning serves directly. (Nothing filters
+-- system_events by date either, so it gets no date index below.)
+ALTER TABLE emergency_detections ADD PRIMARY KEY (id, detection_time);
+ALTER TABLE emergency_detections ADD UNIQUE (detection_id, detection_time);
+ALTER TABLE emergency_detections ADD FOREIGN KEY (signal_id) REFERENCES traffic_signals(id);
+
+CREATE INDEX IF NOT EXISTS idx_emergency_detections_vehicle_type ON emergency_detections(vehicle_type);
+CREATE INDEX IF NOT EXISTS idx_emergency_detections_confidence ON emergency_detections(confidence DESC);
+CREATE INDEX IF NOT EXISTS idx_emergency_detections_verified ON emergency_detections(is_verified);
+CREATE INDEX IF NOT EXISTS idx_emergency_detections_false_positive ON emergency_detections(is_false_positive);
+CREATE INDEX IF NOT EXISTS idx_emergency_detections_signal_time_covering
+    ON emergency_detections(signal_id, detection_time DESC) INCLUDE (confidence);
+
+-- System events: same treatment, partitioned on timestamp
+ALTER TABLE system_events RENAME TO system_events_unpartitioned;
+UPDATE system_events_unpartitioned SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL;
+
+CREATE TABLE system_events (
+    LIKE system_events_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+) PARTITION BY RANGE (timestamp);
+
+ALTER TABLE system_events ALTER COLUMN timestamp SET NOT NULL;
+
+CREATE TABLE system_events_default PARTITION OF system_events DEFAULT;
+
+SELECT create_daily_partitions(
+    'system_events',
+    COALESCE((SELECT MIN(timestamp)::date FROM system_events_unpartitioned), CURRENT_DATE),
+    CURRENT_DATE + 7
+);
+
+INSERT INTO system_events SELECT * FROM system_events_unpartitioned;
+
+ALTER SEQUENCE system_events_id_seq OWNED BY system_events.id;
+DROP TABLE system_events_unpartitioned;
+
+ALTER TABLE system_events ADD PRIMARY KEY (id, timestamp);
+ALTER TABLE system_events ADD UNIQUE (event_id, timestamp);
+ALTER TABLE system_events ADD FOREIGN KEY (signal_id) REFERENCES traffic_signals(id);
+
+CREATE INDEX IF NOT EXISTS idx_system_events_type_time ON system_events(event_type, timestamp);
+CREATE INDEX IF NOT EXISTS idx_system_events_severity ON system_events(severity);
+CREATE INDEX IF NOT EXISTS idx_system_events_signal ON system_events(signal_id);
+CREATE INDEX IF NOT EXISTS idx_system_events_resolved ON system_events(is_resolved);
+
+-- Keep a week of partitions ahead with pg_cron (the application also does this at startup
+-- and once a day). pg_cron only runs in cron.database_name, so the job is scheduled with
+-- cron.schedule_in_database() targeting this database; when this migration runs elsewhere,
+-- the statement to run in the cron database is printed instead.
+DO $$
+DECLARE
+    cron_database TEXT := current_setting('cron.database_name', true);
+    job_command TEXT := 'SELECT maintain_daily_partitions(''emergency_detections'', 7), '
+                        'maintain_daily_partitions(''system_events'', 7)';
+BEGIN
+    IF cron_database IS NULL THEN
+        RAISE NOTICE 'pg_cron is not loaded; partitions are maintained by the application only';
+    ELSIF cron_database = current_database() THEN
+        CREATE EXTENSION IF NOT EXISTS pg_cron;
+        PERFORM cron.schedule_in_database('maintain-daily-partitions', '0 1 * * *', job_command, current_database());
+    ELSE
+        RAISE NOTICE '%', format(
+            'pg_cron runs in database %s; run there: SELECT cron.schedule_in_database(%L, %L, %L, %L);',
+            cron_database, 'maintain-daily-partitions', '0 1 * * *', job_command, current_database()
+        );
+    END IF;
+EXCEPTION WHEN OTHERS THEN
+    RAISE NOTICE 'Could not schedule partition maintenance: %', SQLERRM;
+END;
+$$;
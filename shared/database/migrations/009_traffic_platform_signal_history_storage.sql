@@ -0,0 +1,15 @@
+-- Migration: 009_traffic_platform_signal_history_storage.sql
+-- Branch: traffic-management
+-- Description: Tune append-only signal_state_history for index-only time-range scans
+
+-- Vacuum on inserts so the visibility map stays current for index-only scans
+ALTER TABLE signal_state_history SET (
+    autovacuum_vacuum_scale_factor = 0.0,
+    autovacuum_vacuum_insert_scale_factor = 0.02
+);
+
+-- Per-signal history reads are answered from the index without heap fetches
+CREATE INDEX IF NOT EXISTS idx_signal_history_signal_start_covering
+    ON signal_state_history(signal_id, start_time DESC)
+    INCLUDE (state, state_duration, is_emergency_override);
+DROP INDEX IF EXISTS idx_signal_history_signal_time;
@@ -1,17 +1,115 @@
 import os
 import logging
+import atexit
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from psycopg2.pool import SimpleConnectionPool
+import psycopg2.extensions
+from psycopg2.extras import RealDictCursor, Json, execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from cachetools import TTLCache
 from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import json
-import sys
+import io
+import csv
+import gzip
+import re
+import threading
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-# Add shared database config to path
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'shared', 'database'))
+try:
+    import orjson
+    
+    # Accept what json.dumps accepts: non-str dict keys, numpy scalars and other int/float subclasses
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    
+    def _orjson_default(obj):
+        if isinstance(obj, float):
+            return float(obj)
+        if isinstance(obj, int):
+            return int(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj, default=_orjson_default, option=_ORJSON_OPTIONS).decode()
+except ImportError:
+    _json_dumps = json.dumps
+
+# Hot-path queries, prepared server-side on first use per connection
+PREPARED_QUERIES = {
+    'log_emergency_detection': """
+        INSERT INTO emergency_detections
+        (signal_id, vehicle_type, confidence, detection_time,
+         image_path, bbox_coordinates, features_detected, action_taken, response_time_ms)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        RETURNING detection_id
+    """,
+    'log_signal_state_change': """
+        INSERT INTO signal_state_history
+        (signal_id, state, state_duration, is_emergency_override, override_reason,
+         traffic_density, start_time, end_time)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        RETURNING id
+    """,
+    'create_emergency_route': """
+        INSERT INTO emergency_routes
+        (vehicle_type, start_location, end_location, route_waypoints,
+         signals_coordinated, total_distance, estimated_duration, priority_level)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        RETURNING route_id
+    """,
+    'get_signal_by_id': """
+        SELECT id, name, latitude, longitude, location_description,
+               signal_type, status, installation_date, last_maintenance,
+               default_timing, emergency_override_enabled, ai_detection_enabled,
+               ip_address, last_heartbeat, connection_status
+        FROM traffic_signals
+        WHERE id = %s
+    """,
+}
+
+def _positional_params(query: str) -> str:
+    """Rewrite psycopg2 %s placeholders as the $1, $2, ... that PREPARE expects"""
+    counter = iter(range(1, query.count('%s') + 1))
+    return re.sub(r'%s', lambda _: f"${next(counter)}", query)
+
+def _jsonb(value):
+    """Adapt a dict/list for a JSONB parameter; empty or missing values become NULL"""
+    return Json(value, dumps=_json_dumps) if value else None
+
+class PooledConnection(psycopg2.extensions.connection):
+    """Connection carrying pool bookkeeping: registered PREPARED_QUERIES and last use time"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+        self.last_used = time.monotonic()
 
 class DatabaseManager:
+    # Rows per statement for execute_values writes (heartbeat and event flushes)
+    BATCH_PAGE_SIZE = 1000
+    
+    # Skips the WAL flush wait at commit for high-volume, loss-tolerant log writes
+    ASYNC_COMMIT_SQL = "SET LOCAL synchronous_commit = OFF"
+    
+    # Tables range-partitioned by day (see migration 008)
+    PARTITIONED_TABLES = ('emergency_detections', 'system_events')
+    PARTITION_DAYS_AHEAD = 7
+    
+    # System events are queued by callers and written behind in batches
+    EVENT_QUEUE_MAX = 50000
+    EVENT_BATCH_SIZE = 500
+    EVENT_FLUSH_INTERVAL = 0.1
+    SYSTEM_EVENT_INSERT_SQL = """
+        INSERT INTO system_events (event_type, event_source, event_data, 
+                                 severity, message, signal_id)
+        VALUES %s
+    """
+    
+    # Pooled connections idle longer than this are pinged before reuse
+    IDLE_PING_SECONDS = 300
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         
@@ -19,10 +117,41 @@ class DatabaseManager:
         self.branch_name = 'traffic'
         self.db_url = self._get_neon_connection_string()
         
+        # Server-side PREPARE needs a session-level connection; disable behind transaction poolers
+        self.use_prepared_statements = os.getenv('DB_PREPARED_STATEMENTS', 'true').lower() == 'true'
+        
         # Connection pool
         self.connection_pool = None
         self._initialize_connection_pool()
         
+        # Heartbeats are coalesced per signal and flushed in one UPDATE per interval
+        self.heartbeat_flush_interval = float(os.getenv('HEARTBEAT_FLUSH_INTERVAL', 1.0))
+        self._heartbeat_buffer: Dict[str, tuple] = {}
+        self._heartbeat_lock = threading.Lock()
+        self._heartbeat_stop = threading.Event()
+        # The heartbeat thread also keeps partitions created ahead, once per day
+        self._partitions_checked_on: Optional[date] = None
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat_flush_loop, daemon=True)
+        self._heartbeat_thread.start()
+        
+        # Short-lived caches for rarely changing signal and hospital metadata
+        cache_ttl = float(os.getenv('DB_CACHE_TTL', 30))
+        self._signal_cache = TTLCache(maxsize=2048, ttl=cache_ttl)
+        self._hospital_cache = TTLCache(maxsize=64, ttl=cache_ttl)
+        self._cache_lock = threading.Lock()
+        # Newest heartbeat per signal, overlaid on cached rows so they are never mutated
+        self._latest_heartbeats: Dict[str, tuple] = {}
+        
+        self._event_queue = queue.Queue(maxsize=self.EVENT_QUEUE_MAX)
+        self._event_stop = threading.Event()
+        self._event_thread = threading.Thread(target=self._event_flush_loop, daemon=True)
+        self._event_thread.start()
+        
+        # Buffered heartbeats and queued events live on daemon threads; flush them on exit
+        self._closed = False
+        self._close_lock = threading.Lock()
+        atexit.register(self.close_all_connections)
+        
         print(f'🚦 Traffic Platform using Neon traffic-management branch')
     
     def _get_neon_connection_string(self):
@@ -43,13 +172,30 @@ class DatabaseManager:
         
         return connection_string
     
+    def _get_pool_dsn(self):
+        """Add keepalive, application name and JIT settings to the connection string"""
+        params = psycopg2.extensions.parse_dsn(self.db_url)
+        
+        # JIT compile time outweighs execution for the short queries issued here
+        options = ' '.join(filter(None, [params.get('options'), '-c jit=off']))
+        
+        return psycopg2.extensions.make_dsn(
+            self.db_url,
+            keepalives=1,
+            keepalives_idle=30,
+            keepalives_interval=10,
+            application_name='traffic-platform',
+            options=options
+        )
+    
     def _initialize_connection_pool(self):
         """Initialize database connection pool"""
         try:
-            self.connection_pool = SimpleConnectionPool(
+            self.connection_pool = ThreadedConnectionPool(
                 minconn=1,
-                maxconn=10,
-                dsn=self.db_url
+                maxconn=20,
+                dsn=self._get_pool_dsn(),
+                connection_factory=PooledConnection
             )
             self.logger.info("✅ Traffic Platform database connection pool initialized with Neon traffic-management branch")
         except Exception as e:
@@ -59,14 +205,58 @@ class DatabaseManager:
     def get_connection(self):
         """Get a connection from the pool"""
         try:
-            return self.connection_pool.getconn()
+            conn = self.connection_pool.getconn()
+            if not self._connection_alive(conn):
+                self.connection_pool.putconn(conn, close=True)
+                conn = self.connection_pool.getconn()
+            return conn
         except Exception as e:
             self.logger.error(f"Failed to get database connection: {e}")
             raise
     
+    def _connection_alive(self, conn) -> bool:
+        """Ping connections that sat idle long enough for the server or network to drop them"""
+        if conn.closed:
+            return False
+        if time.monotonic() - conn.last_used < self.IDLE_PING_SECONDS:
+            return True
+        
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+    
+    def _execute_prepared(self, cursor, name: str, params: tuple, synchronous_commit: bool = True):
+        """Run one of PREPARED_QUERIES, via EXECUTE when prepared statements are enabled
+        
+        With synchronous_commit=False the transaction commits without waiting
+        for the WAL flush; only use it for records that are cheap to lose.
+        """
+        if self.use_prepared_statements:
+            # Prepare on first use per connection; a failed PREPARE leaves nothing
+            # registered, and a successful one survives a later rollback
+            conn = cursor.connection
+            if name not in conn.prepared_statements:
+                cursor.execute(f"PREPARE {name} AS {_positional_params(PREPARED_QUERIES[name])}")
+                conn.prepared_statements.add(name)
+            placeholders = ', '.join(['%s'] * len(params))
+            query = f"EXECUTE {name} ({placeholders})"
+        else:
+            query = PREPARED_QUERIES[name]
+        
+        if not synchronous_commit:
+            query = f"{self.ASYNC_COMMIT_SQL}; {query}"
+        
+        cursor.execute(query, params)
+    
     def return_connection(self, conn):
         """Return a connection to the pool"""
         try:
+            conn.last_used = time.monotonic()
             self.connection_pool.putconn(conn)
         except Exception as e:
             self.logger.error(f"Failed to return database connection: {e}")
@@ -84,6 +274,9 @@ class DatabaseManager:
             cursor.close()
             self.return_connection(conn)
             
+            # Make sure the upcoming daily partitions exist before rows arrive for them
+            self.ensure_partitions()
+            
             self.logger.info("✅ Traffic Platform database initialized successfully with Neon traffic-management branch")
             
         except Exception as e:
@@ -93,6 +286,40 @@ class DatabaseManager:
                 self.return_connection(conn)
             raise
     
+    def ensure_partitions(self) -> bool:
+        """Create the upcoming daily partitions and move stray rows out of the DEFAULT partitions
+        
+        Runs at startup and once a day from the heartbeat thread; failures are
+        logged rather than raised, since rows still land in the DEFAULT partition.
+        """
+        self._partitions_checked_on = date.today()
+        conn = None
+        cursor = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            for table in self.PARTITIONED_TABLES:
+                cursor.execute(
+                    "SELECT maintain_daily_partitions(%s, %s)",
+                    (table, self.PARTITION_DAYS_AHEAD)
+                )
+                conn.commit()
+            
+            cursor.close()
+            self.return_connection(conn)
+            
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Failed to maintain daily partitions: {e}")
+            if conn:
+                conn.rollback()
+                if cursor:
+                    cursor.close()
+                self.return_connection(conn)
+            return False
+    
     def log_emergency_detection(self, signal_id: str, vehicle_type: str, 
                               confidence: float, detection_time: datetime,
                               bbox_coordinates: Dict = None, features_detected: List = None,
@@ -103,22 +330,12 @@ class DatabaseManager:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            # Generate detection ID
-            cursor.execute("SELECT COUNT(*) FROM emergency_detections WHERE detection_time::date = CURRENT_DATE")
-            daily_count = cursor.fetchone()[0] + 1
-            detection_id = f"ED-{datetime.now().strftime('%Y')}-{daily_count:03d}"
-            
-            cursor.execute("""
-                INSERT INTO emergency_detections 
-                (detection_id, signal_id, vehicle_type, confidence, detection_time, 
-                 image_path, bbox_coordinates, features_detected, action_taken, response_time_ms)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING detection_id
-            """, (
-                detection_id, signal_id, vehicle_type, confidence, detection_time,
+            # detection_id defaults to a sequence-backed ID (see migration 006)
+            self._execute_prepared(cursor, 'log_emergency_detection', (
+                signal_id, vehicle_type, confidence, detection_time,
                 image_path,
-                json.dumps(bbox_coordinates) if bbox_coordinates else None,
-                json.dumps(features_detected) if features_detected else None,
+                _jsonb(bbox_coordinates),
+                _jsonb(features_detected),
                 action_taken, response_time_ms
             ))
             
@@ -137,6 +354,103 @@ class DatabaseManager:
                 self.return_connection(conn)
             raise
     
+    def log_emergency_detections_batch(self, detections: List[Dict]) -> List[str]:
+        """Log many emergency vehicle detections in one INSERT ... SELECT FROM UNNEST
+        
+        Each item takes the same keys as log_emergency_detection's arguments.
+        """
+        if not detections:
+            return []
+        
+        conn = None
+        cursor = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            rows = [(
+                d['signal_id'], d['vehicle_type'], d['confidence'], d['detection_time'],
+                d.get('image_path'),
+                _jsonb(d.get('bbox_coordinates')),
+                _jsonb(d.get('features_detected')),
+                d.get('action_taken'), d.get('response_time_ms')
+            ) for d in detections]
+            
+            # One array per column, so the statement shape is the same for any batch size
+            cursor.execute("""
+                INSERT INTO emergency_detections 
+                (signal_id, vehicle_type, confidence, detection_time, 
+                 image_path, bbox_coordinates, features_detected, action_taken, response_time_ms)
+                SELECT * FROM UNNEST(
+                    %s::varchar[], %s::vehicle_type_enum[], %s::numeric[], %s::timestamp[],
+                    %s::varchar[], %s::jsonb[], %s::jsonb[], %s::detection_action_enum[], %s::integer[]
+                )
+                RETURNING detection_id
+            """, [list(column) for column in zip(*rows)])
+            
+            results = cursor.fetchall()
+            conn.commit()
+            cursor.close()
+            self.return_connection(conn)
+            
+            return [row[0] for row in results]
+            
+        except Exception as e:
+            self.logger.error(f"Failed to log emergency detections batch: {e}")
+            if conn:
+                conn.rollback()
+                if cursor:
+                    cursor.close()
+                self.return_connection(conn)
+            raise
+    
+    def bulk_log_emergency_detections(self, detections) -> int:
+        """Stream a large backlog of emergency detections in with COPY
+        
+        Accepts any iterable of dicts keyed like log_emergency_detection's
+        arguments and returns the number of rows loaded.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for d in detections:
+            writer.writerow([
+                d['signal_id'], d['vehicle_type'], d['confidence'], d['detection_time'],
+                d.get('image_path'),
+                _json_dumps(d['bbox_coordinates']) if d.get('bbox_coordinates') else None,
+                _json_dumps(d['features_detected']) if d.get('features_detected') else None,
+                d.get('action_taken'), d.get('response_time_ms')
+            ])
+        buffer.seek(0)
+        
+        conn = None
+        cursor = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.copy_expert("""
+                COPY emergency_detections 
+                (signal_id, vehicle_type, confidence, detection_time, 
+                 image_path, bbox_coordinates, features_detected, action_taken, response_time_ms)
+                FROM STDIN WITH (FORMAT csv)
+            """, buffer)
+            
+            row_count = cursor.rowcount
+            conn.commit()
+            cursor.close()
+            self.return_connection(conn)
+            
+            return row_count
+            
+        except Exception as e:
+            self.logger.error(f"Failed to bulk log emergency detections: {e}")
+            if conn:
+                conn.rollback()
+                if cursor:
+                    cursor.close()
+                self.return_connection(conn)
+            raise
+    
     def log_signal_state_change(self, signal_id: str, state: str, duration: int,
                               is_emergency_override: bool = False, override_reason: str = None,
                               traffic_density: float = None) -> int:
@@ -148,16 +462,10 @@ class DatabaseManager:
             start_time = datetime.utcnow()
             end_time = start_time + timedelta(seconds=duration)
             
-            cursor.execute("""
-                INSERT INTO signal_state_history 
-                (signal_id, state, state_duration, is_emergency_override, override_reason, 
-                 traffic_density, start_time, end_time)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
-            """, (
+            self._execute_prepared(cursor, 'log_signal_state_change', (
                 signal_id, state, duration, is_emergency_override, override_reason,
                 traffic_density, start_time, end_time
-            ))
+            ), synchronous_commit=False)
             
             history_id = cursor.fetchone()[0]
             conn.commit()
@@ -174,6 +482,56 @@ class DatabaseManager:
                 self.return_connection(conn)
             raise
     
+    def log_signal_state_changes_batch(self, changes: List[Dict]) -> List[int]:
+        """Log many signal state changes in one INSERT ... SELECT FROM UNNEST
+        
+        Each item takes the same keys as log_signal_state_change's arguments.
+        """
+        if not changes:
+            return []
+        
+        conn = None
+        cursor = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            start_time = datetime.utcnow()
+            rows = [(
+                c['signal_id'], c['state'], c['duration'],
+                c.get('is_emergency_override', False), c.get('override_reason'),
+                c.get('traffic_density'), start_time,
+                start_time + timedelta(seconds=c['duration'])
+            ) for c in changes]
+            
+            cursor.execute(self.ASYNC_COMMIT_SQL)
+            cursor.execute("""
+                INSERT INTO signal_state_history 
+                (signal_id, state, state_duration, is_emergency_override, override_reason, 
+                 traffic_density, start_time, end_time)
+                SELECT * FROM UNNEST(
+                    %s::varchar[], %s::signal_state_enum[], %s::integer[], %s::boolean[],
+                    %s::text[], %s::numeric[], %s::timestamp[], %s::timestamp[]
+                )
+                RETURNING id
+            """, [list(column) for column in zip(*rows)])
+            
+            results = cursor.fetchall()
+            conn.commit()
+            cursor.close()
+            self.return_connection(conn)
+            
+            return [row[0] for row in results]
+            
+        except Exception as e:
+            self.logger.error(f"Failed to log signal state changes batch: {e}")
+            if conn:
+                conn.rollback()
+                if cursor:
+                    cursor.close()
+                self.return_connection(conn)
+            raise
+    
     def create_emergency_route(self, vehicle_type: str,
                              start_location: Dict, end_location: Dict,
                              route_waypoints: List = None, signals_coordinated: List = None,
@@ -184,21 +542,11 @@ class DatabaseManager:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            # Generate route ID
-            cursor.execute("SELECT COUNT(*) FROM emergency_routes WHERE created_at::date = CURRENT_DATE")
-            daily_count = cursor.fetchone()[0] + 1
-            route_id = f"ER-{datetime.now().strftime('%Y')}-{daily_count:03d}"
-            
-            cursor.execute("""
-                INSERT INTO emergency_routes 
-                (route_id, vehicle_type, start_location, end_location, route_waypoints,
-                 signals_coordinated, total_distance, estimated_duration, priority_level)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING route_id
-            """, (
-                route_id, vehicle_type, json.dumps(start_location), json.dumps(end_location),
-                json.dumps(route_waypoints) if route_waypoints else None,
-                json.dumps(signals_coordinated) if signals_coordinated else None,
+            # route_id defaults to a sequence-backed ID (see migration 006)
+            self._execute_prepared(cursor, 'create_emergency_route', (
+                vehicle_type, Json(start_location, dumps=_json_dumps), Json(end_location, dumps=_json_dumps),
+                _jsonb(route_waypoints),
+                _jsonb(signals_coordinated),
                 total_distance, estimated_duration, priority_level
             ))
             
@@ -262,7 +610,7 @@ class DatabaseManager:
             cursor.close()
             self.return_connection(conn)
             
-            return [dict(signal) for signal in signals]
+            return signals
             
         except Exception as e:
             self.logger.error(f"Failed to get all signals: {e}")
@@ -273,24 +621,27 @@ class DatabaseManager:
     
     def get_signal_by_id(self, signal_id: str) -> Optional[Dict]:
         """Get specific traffic signal by ID"""
+        with self._cache_lock:
+            signal = self._signal_cache.get(signal_id)
+        if signal is not None:
+            return self._with_latest_heartbeat(signal)
+        
         try:
             conn = self.get_connection()
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
-            cursor.execute("""
-                SELECT id, name, latitude, longitude, location_description, 
-                       signal_type, status, installation_date, last_maintenance,
-                       default_timing, emergency_override_enabled, ai_detection_enabled,
-                       ip_address, last_heartbeat, connection_status
-                FROM traffic_signals 
-                WHERE id = %s
-            """, (signal_id,))
+            self._execute_prepared(cursor, 'get_signal_by_id', (signal_id,))
             
             signal = cursor.fetchone()
             cursor.close()
             self.return_connection(conn)
             
-            return dict(signal) if signal else None
+            if signal:
+                with self._cache_lock:
+                    self._signal_cache[signal_id] = signal
+                return self._with_latest_heartbeat(signal)
+            
+            return signal
             
         except Exception as e:
             self.logger.error(f"Failed to get signal {signal_id}: {e}")
@@ -300,28 +651,82 @@ class DatabaseManager:
             return None
     
     def update_signal_heartbeat(self, signal_id: str, connection_status: str = 'connected'):
-        """Update signal heartbeat and connection status"""
+        """Record signal heartbeat and connection status (written on the next flush)"""
+        heartbeat = datetime.utcnow()
+        with self._heartbeat_lock:
+            self._heartbeat_buffer[signal_id] = (heartbeat, connection_status)
+        
+        # Keep cached signals current rather than evicting them on every heartbeat
+        with self._cache_lock:
+            self._latest_heartbeats[signal_id] = (heartbeat, connection_status)
+    
+    def _with_latest_heartbeat(self, signal: Dict) -> Dict:
+        """Copy a cached signal row, applying a heartbeat newer than the one it was read with"""
+        signal = dict(signal)
+        with self._cache_lock:
+            latest = self._latest_heartbeats.get(signal['id'])
+        if latest and (signal['last_heartbeat'] is None or latest[0] > signal['last_heartbeat']):
+            signal['last_heartbeat'], signal['connection_status'] = latest
+        return signal
+    
+    def invalidate_signal_cache(self, signal_id: str = None):
+        """Drop one cached signal (or all of them) after an admin edit"""
+        with self._cache_lock:
+            if signal_id is None:
+                self._signal_cache.clear()
+            else:
+                self._signal_cache.pop(signal_id, None)
+    
+    def flush_signal_heartbeats(self):
+        """Write all buffered heartbeats in a single UPDATE ... FROM (VALUES ...)"""
+        with self._heartbeat_lock:
+            pending = self._heartbeat_buffer
+            self._heartbeat_buffer = {}
+        
+        if not pending:
+            return
+        
+        conn = None
+        cursor = None
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            cursor.execute("""
-                UPDATE traffic_signals 
-                SET last_heartbeat = %s, connection_status = %s, updated_at = %s
-                WHERE id = %s
-            """, (datetime.utcnow(), connection_status, datetime.utcnow(), signal_id))
+            cursor.execute(self.ASYNC_COMMIT_SQL)
+            execute_values(cursor, """
+                UPDATE traffic_signals t
+                SET last_heartbeat = v.heartbeat, connection_status = v.connection_status,
+                    updated_at = v.heartbeat
+                FROM (VALUES %s) AS v(id, heartbeat, connection_status)
+                WHERE t.id = v.id
+            """, [
+                (signal_id, heartbeat, connection_status)
+                for signal_id, (heartbeat, connection_status) in pending.items()
+            ], page_size=self.BATCH_PAGE_SIZE)
             
             conn.commit()
             cursor.close()
             self.return_connection(conn)
             
         except Exception as e:
-            self.logger.error(f"Failed to update signal heartbeat: {e}")
+            self.logger.error(f"Failed to flush signal heartbeats: {e}")
+            # Keep failed heartbeats for the next flush unless a newer one arrived meanwhile
+            with self._heartbeat_lock:
+                for signal_id, heartbeat in pending.items():
+                    self._heartbeat_buffer.setdefault(signal_id, heartbeat)
             if conn:
                 conn.rollback()
-                cursor.close()
+                if cursor:
+                    cursor.close()
                 self.return_connection(conn)
     
+    def _heartbeat_flush_loop(self):
+        """Background thread flushing buffered heartbeats every interval"""
+        while not self._heartbeat_stop.wait(self.heartbeat_flush_interval):
+            self.flush_signal_heartbeats()
+            if self._partitions_checked_on != date.today():
+                self.ensure_partitions()
+    
     def get_traffic_analytics(self, start_date: str = None, end_date: str = None) -> Dict:
         """Get traffic analytics data"""
         try:
@@ -329,65 +734,65 @@ class DatabaseManager:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
             # Default to last 7 days if no dates provided
+            today = datetime.now()
             if not start_date:
-                start_date = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
+                start_date = (today - timedelta(days=7)).strftime('%Y-%m-%d')
             if not end_date:
-                end_date = datetime.now().strftime('%Y-%m-%d')
+                end_date = today.strftime('%Y-%m-%d')
             
-            # Get overall analytics
+            # Overall, daily and signal-wise statistics in one round trip over a shared scan;
+            # the half-open detection_time range lets the planner prune daily partitions
             cursor.execute("""
+                WITH base AS (
+                    SELECT id, signal_id, vehicle_type, confidence, detection_time
+                    FROM emergency_detections 
+                    WHERE detection_time >= %(start_date)s AND detection_time < %(end_date)s::date + 1
+                ),
+                overall AS (
+                    SELECT 
+                        COUNT(*) as total_detections,
+                        COUNT(DISTINCT signal_id) as signals_with_detections,
+                        AVG(confidence) as avg_confidence,
+                        COUNT(CASE WHEN vehicle_type = 'ambulance' THEN 1 END) as ambulance_detections,
+                        COUNT(CASE WHEN vehicle_type = 'police' THEN 1 END) as police_detections,
+                        COUNT(CASE WHEN vehicle_type = 'fire_truck' THEN 1 END) as fire_truck_detections
+                    FROM base
+                ),
+                daily AS (
+                    SELECT 
+                        detection_time::date as date,
+                        COUNT(*) as detections,
+                        COUNT(DISTINCT signal_id) as signals_involved,
+                        AVG(confidence) as avg_confidence
+                    FROM base
+                    GROUP BY detection_time::date
+                ),
+                signal_stats AS (
+                    SELECT 
+                        s.id, s.name,
+                        COUNT(ed.id) as detections,
+                        AVG(ed.confidence) as avg_confidence,
+                        MAX(ed.detection_time) as last_detection
+                    FROM traffic_signals s
+                    LEFT JOIN base ed ON s.id = ed.signal_id
+                    GROUP BY s.id, s.name
+                )
                 SELECT 
-                    COUNT(*) as total_detections,
-                    COUNT(DISTINCT signal_id) as signals_with_detections,
-                    AVG(confidence) as avg_confidence,
-                    COUNT(CASE WHEN vehicle_type = 'ambulance' THEN 1 END) as ambulance_detections,
-                    COUNT(CASE WHEN vehicle_type = 'police' THEN 1 END) as police_detections,
-                    COUNT(CASE WHEN vehicle_type = 'fire_truck' THEN 1 END) as fire_truck_detections
-                FROM emergency_detections 
-                WHERE detection_time::date BETWEEN %s AND %s
-            """, (start_date, end_date))
-            
-            overall_stats = cursor.fetchone()
-            
-            # Get daily breakdown
-            cursor.execute("""
-                SELECT 
-                    detection_time::date as date,
-                    COUNT(*) as detections,
-                    COUNT(DISTINCT signal_id) as signals_involved,
-                    AVG(confidence) as avg_confidence
-                FROM emergency_detections 
-                WHERE detection_time::date BETWEEN %s AND %s
-                GROUP BY detection_time::date
-                ORDER BY date
-            """, (start_date, end_date))
-            
-            daily_stats = cursor.fetchall()
-            
-            # Get signal-wise statistics
-            cursor.execute("""
-                SELECT 
-                    s.id, s.name,
-                    COUNT(ed.id) as detections,
-                    AVG(ed.confidence) as avg_confidence,
-                    MAX(ed.detection_time) as last_detection
-                FROM traffic_signals s
-                LEFT JOIN emergency_detections ed ON s.id = ed.signal_id 
-                    AND ed.detection_time::date BETWEEN %s AND %s
-                GROUP BY s.id, s.name
-                ORDER BY detections DESC
-            """, (start_date, end_date))
-            
-            signal_stats = cursor.fetchall()
+                    (SELECT row_to_json(overall) FROM overall) as overall,
+                    COALESCE((SELECT json_agg(daily ORDER BY date) FROM daily), '[]'::json) as daily_breakdown,
+                    COALESCE((SELECT json_agg(signal_stats ORDER BY detections DESC) FROM signal_stats), '[]'::json) as signal_statistics
+            """, {'start_date': start_date, 'end_date': end_date})
+            
+            analytics = cursor.fetchone()
             
             cursor.close()
             self.return_connection(conn)
             
             return {
                 'period': {'start_date': start_date, 'end_date': end_date},
-                'overall': dict(overall_stats) if overall_stats else {},
-                'daily_breakdown': [dict(day) for day in daily_stats],
-                'signal_statistics': [dict(signal) for signal in signal_stats]
+                'overall': analytics['overall'] or {},
+                'daily_breakdown': analytics['daily_breakdown'],
+                'signal_statistics': analytics['signal_statistics']
             }
             
         except Exception as e:
@@ -404,66 +809,67 @@ class DatabaseManager:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
             # Default to last 30 days if no dates provided
+            today = datetime.now()
             if not start_date:
-                start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+                start_date = (today - timedelta(days=30)).strftime('%Y-%m-%d')
             if not end_date:
-                end_date = datetime.now().strftime('%Y-%m-%d')
+                end_date = today.strftime('%Y-%m-%d')
             
-            # Get emergency route statistics
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_routes,
-                    COUNT(CASE WHEN status = 'completed' THEN 1 END) as completed_routes,
-                    AVG(total_distance) as avg_distance,
-                    AVG(estimated_duration) as avg_estimated_duration,
-                    AVG(actual_duration) as avg_actual_duration,
-                    AVG(time_saved) as avg_time_saved,
-                    COUNT(CASE WHEN vehicle_type = 'ambulance' THEN 1 END) as ambulance_routes,
-                    COUNT(CASE WHEN vehicle_type = 'police' THEN 1 END) as police_routes,
-                    COUNT(CASE WHEN vehicle_type = 'fire_truck' THEN 1 END) as fire_truck_routes
-                FROM emergency_routes 
-                WHERE created_at::date BETWEEN %s AND %s
-            """, (start_date, end_date))
-            
-            route_stats = cursor.fetchone()
-            
-            # Get response time statistics
-            cursor.execute("""
-                SELECT 
-                    AVG(response_time_ms) as avg_response_time,
-                    MIN(response_time_ms) as min_response_time,
-                    MAX(response_time_ms) as max_response_time,
-                    COUNT(CASE WHEN response_time_ms < 1000 THEN 1 END) as fast_responses,
-                    COUNT(CASE WHEN response_time_ms >= 1000 AND response_time_ms < 3000 THEN 1 END) as medium_responses,
-                    COUNT(CASE WHEN response_time_ms >= 3000 THEN 1 END) as slow_responses
-                FROM emergency_detections 
-                WHERE detection_time::date BETWEEN %s AND %s 
-                AND response_time_ms IS NOT NULL
-            """, (start_date, end_date))
-            
-            response_stats = cursor.fetchone()
-            
-            # Get hourly distribution
+            # Route, response time and hourly statistics in one round trip
             cursor.execute("""
+                WITH detections AS (
+                    SELECT detection_time, response_time_ms
+                    FROM emergency_detections 
+                    WHERE detection_time >= %(start_date)s AND detection_time < %(end_date)s::date + 1
+                ),
+                route_stats AS (
+                    SELECT 
+                        COUNT(*) as total_routes,
+                        COUNT(CASE WHEN status = 'completed' THEN 1 END) as completed_routes,
+                        AVG(total_distance) as avg_distance,
+                        AVG(estimated_duration) as avg_estimated_duration,
+                        AVG(actual_duration) as avg_actual_duration,
+                        AVG(time_saved) as avg_time_saved,
+                        COUNT(CASE WHEN vehicle_type = 'ambulance' THEN 1 END) as ambulance_routes,
+                        COUNT(CASE WHEN vehicle_type = 'police' THEN 1 END) as police_routes,
+                        COUNT(CASE WHEN vehicle_type = 'fire_truck' THEN 1 END) as fire_truck_routes
+                    FROM emergency_routes 
+                    WHERE created_at::date BETWEEN %(start_date)s AND %(end_date)s
+                ),
+                response_stats AS (
+                    SELECT 
+                        AVG(response_time_ms) as avg_response_time,
+                        MIN(response_time_ms) as min_response_time,
+                        MAX(response_time_ms) as max_response_time,
+                        COUNT(CASE WHEN response_time_ms < 1000 THEN 1 END) as fast_responses,
+                        COUNT(CASE WHEN response_time_ms >= 1000 AND response_time_ms < 3000 THEN 1 END) as medium_responses,
+                        COUNT(CASE WHEN response_time_ms >= 3000 THEN 1 END) as slow_responses
+                    FROM detections 
+                    WHERE response_time_ms IS NOT NULL
+                ),
+                hourly AS (
+                    SELECT 
+                        EXTRACT(hour FROM detection_time) as hour,
+                        COUNT(*) as detections
+                    FROM detections 
+                    GROUP BY EXTRACT(hour FROM detection_time)
+                )
                 SELECT 
-                    EXTRACT(hour FROM detection_time) as hour,
-                    COUNT(*) as detections
-                FROM emergency_detections 
-                WHERE detection_time::date BETWEEN %s AND %s
-                GROUP BY EXTRACT(hour FROM detection_time)
-                ORDER BY hour
-            """, (start_date, end_date))
+                    (SELECT row_to_json(route_stats) FROM route_stats) as route_statistics,
+                    (SELECT row_to_json(response_stats) FROM response_stats) as response_time_statistics,
+                    COALESCE((SELECT json_agg(hourly ORDER BY hour) FROM hourly), '[]'::json) as hourly_distribution
+            """, {'start_date': start_date, 'end_date': end_date})
             
-            hourly_distribution = cursor.fetchall()
+            analytics = cursor.fetchone()
             
             cursor.close()
             self.return_connection(conn)
             
             return {
                 'period': {'start_date': start_date, 'end_date': end_date},
-                'route_statistics': dict(route_stats) if route_stats else {},
-                'response_time_statistics': dict(response_stats) if response_stats else {},
-                'hourly_distribution': [dict(hour) for hour in hourly_distribution]
+                'route_statistics': analytics['route_statistics'] or {},
+                'response_time_statistics': analytics['response_time_statistics'] or {},
+                'hourly_distribution': analytics['hourly_distribution']
             }
             
         except Exception as e:
@@ -476,39 +882,106 @@ class DatabaseManager:
     def log_system_event(self, event_type: str, event_source: str, 
                         event_data: Dict = None, severity: str = 'info', 
                         message: str = None, signal_id: str = None):
-        """Log system events"""
+        """Queue a system event; a background thread writes events in batches"""
+        # Serialize now, so a bad payload costs only this event and later edits to
+        # event_data by the caller cannot change (or race) what gets written
+        try:
+            event_json = _json_dumps(event_data) if event_data else None
+        except (TypeError, ValueError) as e:
+            self.logger.error(f"Dropping {event_type} system event from {event_source}, event_data is not JSON serializable: {e}")
+            return
+        
+        try:
+            self._event_queue.put_nowait(
+                (event_type, event_source, event_json, severity, message, signal_id)
+            )
+        except queue.Full:
+            self.logger.warning(f"System event queue full, dropping {event_type} event from {event_source}")
+    
+    def _drain_events(self, timeout: float) -> List[tuple]:
+        """Collect queued events until the batch is full or the timeout passes"""
+        batch = []
+        deadline = time.monotonic() + timeout
+        while len(batch) < self.EVENT_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._event_queue.get(timeout=remaining))
+                else:
+                    batch.append(self._event_queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    
+    def _write_system_events(self, events: List[tuple]):
+        """Insert a batch of queued system events
+        
+        If the batch is rejected for bad data, events are retried one by one
+        under savepoints so only the offending ones are dropped.
+        """
+        conn = None
+        cursor = None
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            # Generate event ID
-            cursor.execute("SELECT COUNT(*) FROM system_events WHERE timestamp::date = CURRENT_DATE")
-            daily_count = cursor.fetchone()[0] + 1
-            event_id = f"SE-{datetime.now().strftime('%Y%m%d')}-{daily_count:04d}"
-            
-            cursor.execute("""
-                INSERT INTO system_events (event_id, event_type, event_source, event_data, 
-                                         severity, message, signal_id)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (
-                event_id, event_type, event_source, 
-                json.dumps(event_data) if event_data else None,
-                severity, message, signal_id
-            ))
+            # event_id defaults to a sequence-backed ID (see migration 006)
+            cursor.execute(self.ASYNC_COMMIT_SQL)
+            try:
+                execute_values(cursor, self.SYSTEM_EVENT_INSERT_SQL, events, page_size=self.BATCH_PAGE_SIZE)
+            except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+                self.logger.warning(f"System event batch of {len(events)} rejected, retrying individually: {e}")
+                conn.rollback()
+                cursor.execute(self.ASYNC_COMMIT_SQL)
+                self._write_system_events_individually(cursor, events)
             
             conn.commit()
             cursor.close()
             self.return_connection(conn)
             
         except Exception as e:
-            self.logger.error(f"Failed to log system event: {e}")
+            self.logger.error(f"Failed to log {len(events)} system events: {e}")
             if conn:
                 conn.rollback()
-                cursor.close()
+                if cursor:
+                    cursor.close()
                 self.return_connection(conn)
     
+    def _write_system_events_individually(self, cursor, events: List[tuple]):
+        """Insert events one at a time, skipping (and logging) those the database rejects"""
+        for event in events:
+            cursor.execute("SAVEPOINT system_event")
+            try:
+                execute_values(cursor, self.SYSTEM_EVENT_INSERT_SQL, [event])
+            except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT system_event")
+                self.logger.error(f"Dropping {event[0]} system event from {event[1]}: {e}")
+            else:
+                cursor.execute("RELEASE SAVEPOINT system_event")
+    
+    def _event_flush_loop(self):
+        """Background thread writing queued system events"""
+        while not self._event_stop.is_set():
+            batch = self._drain_events(self.EVENT_FLUSH_INTERVAL)
+            if batch:
+                self._write_system_events(batch)
+    
+    def flush_system_events(self):
+        """Write every currently queued system event"""
+        while True:
+            batch = self._drain_events(0)
+            if not batch:
+                break
+            self._write_system_events(batch)
+    
     def get_hospitals(self, hospital_type: str = None, emergency_only: bool = False) -> List[Dict]:
         """Get hospitals for emergency routing"""
+        cache_key = (hospital_type, emergency_only)
+        with self._cache_lock:
+            hospitals = self._hospital_cache.get(cache_key)
+        if hospitals is not None:
+            return [dict(hospital) for hospital in hospitals]
+        
         try:
             conn = self.get_connection()
             cursor = conn.cursor(cursor_factory=RealDictCursor)
@@ -530,6 +1003,10 @@ class DatabaseManager:
             cursor.close()
             self.return_connection(conn)
             
+            with self._cache_lock:
+                self._hospital_cache[cache_key] = hospitals
+            
+            # Callers get copies so edits to a result never leak into the cache
             return [dict(hospital) for hospital in hospitals]
             
         except Exception as e:
@@ -539,54 +1016,109 @@ class DatabaseManager:
                 self.return_connection(conn)
             return []
     
-    def cleanup_old_data(self, days_to_keep: int = 90):
-        """Clean up old data to maintain database performance"""
+    def invalidate_hospital_cache(self):
+        """Drop cached hospital lists after an admin edit"""
+        with self._cache_lock:
+            self._hospital_cache.clear()
+    
+    def _archive_rows(self, cursor, table: str, time_column: str, cutoff_date: datetime, archive_dir: str):
+        """COPY rows older than the cutoff into a gzipped CSV before they are deleted"""
+        os.makedirs(archive_dir, exist_ok=True)
+        # Stamp each run so a second cleanup on the same day never overwrites an earlier archive
+        archive_path = os.path.join(
+            archive_dir,
+            f"{table}_before_{cutoff_date.strftime('%Y%m%d')}_{datetime.now().strftime('%Y%m%dT%H%M%S%f')}.csv.gz"
+        )
+        
+        query = cursor.mogrify(
+            f"SELECT * FROM {table} WHERE {time_column} < %s", (cutoff_date,)
+        ).decode()
+        
+        with gzip.open(archive_path, 'xt', encoding='utf-8') as archive_file:
+            cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", archive_file)
+        
+        self.logger.info(f"Archived {table} rows older than {cutoff_date:%Y-%m-%d} to {archive_path}")
+    
+    def _cleanup_table(self, table: str, time_column: str, cutoff, archive_dir: str = None) -> bool:
+        """Archive (optionally) and delete one table's rows older than the cutoff on its own connection"""
+        conn = None
+        cursor = None
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            cutoff_date = datetime.now() - timedelta(days=days_to_keep)
-            
-            # Clean old emergency detections
-            cursor.execute("""
-                DELETE FROM emergency_detections 
-                WHERE detection_time < %s
-            """, (cutoff_date,))
-            
-            # Clean old signal state history
-            cursor.execute("""
-                DELETE FROM signal_state_history 
-                WHERE start_time < %s
-            """, (cutoff_date,))
+            if archive_dir:
+                self._archive_rows(cursor, table, time_column, cutoff, archive_dir)
             
-            # Clean old system events
-            cursor.execute("""
-                DELETE FROM system_events 
-                WHERE timestamp < %s
-            """, (cutoff_date,))
+            # Drop whole days of partitioned tables, then trim the partial day at the cutoff
+            if table in self.PARTITIONED_TABLES:
+                cursor.execute("SELECT drop_daily_partitions_before(%s, %s)", (table, cutoff.date()))
             
-            # Clean old traffic analytics (keep aggregated data longer)
-            analytics_cutoff = datetime.now() - timedelta(days=days_to_keep * 2)
-            cursor.execute("""
-                DELETE FROM traffic_analytics 
-                WHERE date < %s
-            """, (analytics_cutoff.date(),))
+            cursor.execute(f"DELETE FROM {table} WHERE {time_column} < %s", (cutoff,))
             
             conn.commit()
             cursor.close()
             self.return_connection(conn)
             
-            self.logger.info(f"Cleaned up data older than {days_to_keep} days")
+            return True
             
         except Exception as e:
-            self.logger.error(f"Failed to cleanup old data: {e}")
+            self.logger.error(f"Failed to cleanup old {table} data: {e}")
             if conn:
                 conn.rollback()
-                cursor.close()
+                if cursor:
+                    cursor.close()
                 self.return_connection(conn)
+            return False
+    
+    def cleanup_old_data(self, days_to_keep: int = 90, archive_dir: str = None):
+        """Clean up old data to maintain database performance
+        
+        Tables are cleaned concurrently on separate pool connections. When
+        archive_dir (or DATA_ARCHIVE_DIR) is set, detections, state history
+        and system events are exported there before deletion.
+        """
+        archive_dir = archive_dir or os.getenv('DATA_ARCHIVE_DIR')
+        
+        now = datetime.now()
+        cutoff_date = now - timedelta(days=days_to_keep)
+        # Keep aggregated traffic analytics longer
+        analytics_cutoff = now - timedelta(days=days_to_keep * 2)
+        
+        tasks = [
+            ('emergency_detections', 'detection_time', cutoff_date, archive_dir),
+            ('signal_state_history', 'start_time', cutoff_date, archive_dir),
+            ('system_events', 'timestamp', cutoff_date, archive_dir),
+            ('traffic_analytics', 'date', analytics_cutoff.date(), None),
+        ]
+        
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            results = list(executor.map(lambda task: self._cleanup_table(*task), tasks))
+        
+        if all(results):
+            self.logger.info(f"Cleaned up data older than {days_to_keep} days")
+        else:
+            failed = [task[0] for task, ok in zip(tasks, results) if not ok]
+            self.logger.error(f"Cleanup of data older than {days_to_keep} days failed for: {', '.join(failed)}")
     
     def close_all_connections(self):
-        """Close all database connections"""
+        """Flush buffered heartbeats and events, then close all database connections
+        
+        Registered with atexit; calling it again after the first time does nothing.
+        """
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        
+        self._heartbeat_stop.set()
+        self._heartbeat_thread.join()
+        self.flush_signal_heartbeats()
+        
+        self._event_stop.set()
+        self._event_thread.join()
+        self.flush_system_events()
+        
         if self.connection_pool:
             self.connection_pool.closeall()
             self.logger.info("All database connections closed")
\ No newline at end of file